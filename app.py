@@ -1,6 +1,8 @@
+import calendar
 import streamlit as st
 import pandas as pd
 
+from collections import defaultdict
 from datetime import datetime
 from utils import LeaveOptimizer, create_calendar_html
 
@@ -13,11 +15,37 @@ st.set_page_config(
 
 divider_color = "red"
 
-# Custom CSS for better calendar styling
-with open("styles.css") as f:
-    st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
+all_months = [
+    'January', 'February', 'March', 'April', 'May', 'June',
+    'July', 'August', 'September', 'October', 'November', 'December'
+]
+month_name_to_num = {month: num for num, month in enumerate(all_months, start=1)}
+
+@st.cache_data
+def load_css(path="styles.css"):
+    """Read the stylesheet once and wrap it in a style tag"""
+    with open(path) as f:
+        return f"<style>{f.read()}</style>"
+
+@st.cache_resource
+def get_optimizer(year, country):
+    """Create the optimizer once per year and country across reruns"""
+    return LeaveOptimizer(year, country)
+
+@st.cache_data(max_entries=64)
+def get_optimal_leaves(year, country, num_leaves, months_tuple):
+    """Run the leave optimization once per distinct set of inputs"""
+    return get_optimizer(year, country).get_optimal_leave_days(num_leaves, list(months_tuple))
+
+@st.cache_data(max_entries=16)
+def get_calendar_html(year, holidays_items, leaves_tuple):
+    """Render the annual calendar once per year, holidays and leave days"""
+    return create_calendar_html(year, holidays_items, leaves_tuple)
 
 def main():
+    # Custom CSS for better calendar styling
+    st.markdown(load_css(), unsafe_allow_html=True)
+    
     # Year selection
     current_year = datetime.now().year
     year = st.sidebar.selectbox(
@@ -50,11 +78,6 @@ def main():
     st.sidebar.markdown("<br/>", unsafe_allow_html=True)
     
     # Preferred months filter
-    all_months = [
-        'January', 'February', 'March', 'April', 'May', 'June',
-        'July', 'August', 'September', 'October', 'November', 'December'
-    ]
-    
     preferred_months = st.sidebar.multiselect(
         "Select preferred months for taking leave",
         options=all_months,
@@ -65,20 +88,14 @@ def main():
       preferred_months = all_months  # Default to all months if none selected
     
     # Convert month names to numbers
-    month_name_to_num = {
-        'January': 1, 'February': 2, 'March': 3, 'April': 4,
-        'May': 5, 'June': 6, 'July': 7, 'August': 8,
-        'September': 9, 'October': 10, 'November': 11, 'December': 12
-    }
-    
     preferred_month_nums = [month_name_to_num[month] for month in preferred_months] if preferred_months else list(range(1, 13))
     
     # Create optimizer
-    optimizer = LeaveOptimizer(year, country)
+    optimizer = get_optimizer(year, country)
     
     # Calculate optimal leave days
     with st.spinner("Calculating optimal leave strategy..."):
-        optimal_leaves, total_days_off, leaves_used = optimizer.get_optimal_leave_days(num_leaves, preferred_month_nums)
+        optimal_leaves, total_days_off, leaves_used = get_optimal_leaves(year, country, num_leaves, tuple(sorted(preferred_month_nums)))
     
     # Display results
     col1, col2, col3, col4 = st.columns(4)
@@ -101,7 +118,7 @@ def main():
     st.subheader("📊 &nbsp; Strategy Breakdown", divider=divider_color)
     
     # Count weekends and holidays
-    total_weekends = len([d for d in optimizer.weekends if d.year == year])
+    total_weekends = optimizer.num_weekends
     total_holidays = len(optimizer.holidays)
     
     breakdown_data = {
@@ -118,23 +135,20 @@ def main():
         st.subheader("🎯 &nbsp; Recommended Leave Dates", divider=divider_color)
 
         # Group leave dates by month
-        leave_by_month = {}
+        leave_by_month = defaultdict(list)
         for leave_date in optimal_leaves:
-            month_year = leave_date.strftime("%B %Y")
-            if month_year not in leave_by_month:
-                leave_by_month[month_year] = []
-            leave_by_month[month_year].append(leave_date.strftime("%A, %B %d"))
+            leave_by_month[(leave_date.year, leave_date.month)].append(leave_date.strftime("%A, %B %d"))
 
         # Sort months by date
-        sorted_months = sorted(leave_by_month.keys(), key=lambda x: datetime.strptime(x, "%B %Y"))
+        sorted_months = sorted(leave_by_month)
 
         # Display months in rows of 4 columns with spacing
         for i in range(0, len(sorted_months), 4):
             cols = st.columns(4)
-            for j, month in enumerate(sorted_months[i:i+4]):
+            for j, (leave_year, leave_month) in enumerate(sorted_months[i:i+4]):
                 with cols[j]:
-                    st.markdown(f"**{month}**")
-                    for date in leave_by_month[month]:
+                    st.markdown(f"**{calendar.month_name[leave_month]} {leave_year}**")
+                    for date in leave_by_month[(leave_year, leave_month)]:
                         st.markdown(f"- {date}")
             st.markdown("<br>", unsafe_allow_html=True)  # Adds visual gap between rows
     else:
@@ -147,7 +161,7 @@ def main():
     
     # Display calendar
     st.subheader("📅  &nbsp; Annual Calendar View", divider=divider_color)
-    calendar_html = create_calendar_html(year, optimizer.holidays, optimal_leaves)
+    calendar_html = get_calendar_html(year, tuple(sorted(optimizer.holidays.items())), tuple(optimal_leaves))
     st.markdown(calendar_html, unsafe_allow_html=True)
     st.markdown("<br/>", unsafe_allow_html=True)
     
@@ -179,10 +193,10 @@ def main():
         
     # Show public holidays
     st.subheader("🏛️ &nbsp; Public Holidays", divider=divider_color)
-    holidays_df = pd.DataFrame([
-        {"Date": date.strftime("%A, %B %d, %Y"), "Holiday": name}
-        for date, name in optimizer.holidays.items()
-    ])
+    holidays_df = pd.DataFrame({
+        "Date": pd.DatetimeIndex(list(optimizer.holidays)).strftime("%A, %B %d, %Y"),
+        "Holiday": list(optimizer.holidays.values())
+    })
     st.dataframe(holidays_df, use_container_width=True)
     
     
@@ -1,34 +1,133 @@
 
 import calendar
+import heapq
 import holidays
-from datetime import datetime, timedelta
+import jinja2
+import numpy as np
+from datetime import date, datetime
+from functools import lru_cache
+
+
+# Weekday header cells shared by every month grid
+_DAY_HEADER_ROW = ''.join(
+    f'<div class="day-header">{day}</div>'
+    for day in ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+)
+
+_EMPTY_DAY_CELL = '<div class="day-cell"></div>'
+
+# Day cell classes indexed by weekend + 2 * holiday + 4 * optimal leave
+_DAY_CLASSES = np.array([
+    "day-cell",
+    "day-cell weekend",
+    "day-cell holiday",
+    "day-cell weekend holiday",
+    "day-cell optimal-leave",
+    "day-cell weekend optimal-leave",
+], dtype=object)
+
+# Annual calendar layout: legend, then one flex row of month grids per quarter
+_CALENDAR_TEMPLATE = jinja2.Template("""
+    <div class="calendar-container">
+        <h2 style="text-align: center; color: #2c3e50;">Annual Leave Calendar for {{ year }}</h2>
+        <div class="legend">
+            <div class="legend-item">
+                <div class="legend-color" style="background-color: #e74c3c;"></div>
+                <span>Public Holidays</span>
+            </div>
+            <div class="legend-item">
+                <div class="legend-color" style="background-color: #3498db;"></div>
+                <span>Optimal Leave Days</span>
+            </div>
+            <div class="legend-item">
+                <div class="legend-color" style="background-color: #2ecc71;"></div>
+                <span>Extended Weekends</span>
+            </div>
+            <div class="legend-item">
+                <div class="legend-color" style="background-color: #ecf0f1;"></div>
+                <span>Weekends</span>
+            </div>
+        </div>
+    {% for quarter in quarters %}<div style="display: flex; gap: 20px; margin-bottom: 30px; flex-wrap: wrap;">
+        {%- for month in quarter %}
+            <div style="flex: 1; min-width: 300px;">
+                <div class="month-header">{{ month.name }} {{ year }}</div>
+                <div class="calendar-grid">
+            {{ day_header_row }}{{ empty_cell * month.leading }}
+            {%- for day, day_class, title in month.cells %}<div class="{{ day_class }}" title="{{ title }}">{{ day }}</div>{% endfor %}
+            {{- empty_cell * month.trailing }}</div></div>
+        {%- endfor %}</div>
+    {%- endfor %}</div>""")
+
+
+@lru_cache(maxsize=32)
+def _get_holidays(country, year):
+    """Get the public holidays for a country and year as a plain dict"""
+    return dict(holidays.country_holidays(country, years=year))
+
+
+def _bridge(holiday_ordinal, direction):
+    """Count the working days and weekend days between a holiday and the next weekend
+    
+    Works on proleptic Gregorian ordinals, stepping by direction (-1 or 1).
+    Returns (0, 0) when no weekend is reached within 4 working days.
+    """
+    # Ordinal 1 (0001-01-01) is a Monday, so shift by 6 to get Monday = 0
+    ordinal = holiday_ordinal + direction
+    working_days = 0
+    while (ordinal + 6) % 7 < 5:
+        if working_days == 4:
+            return 0, 0
+        working_days += 1
+        ordinal += direction
+    
+    weekend_days = 0
+    while (ordinal + 6) % 7 >= 5:
+        weekend_days += 1
+        ordinal += direction
+    
+    return working_days, weekend_days
+
+
+def _year_days(year):
+    """Get every day of the year as a datetime64 array"""
+    return np.arange(f'{year}-01-01', f'{year + 1}-01-01', dtype='datetime64[D]')
+
+
+def _weekday(days):
+    """Get the weekday of each datetime64 day, with Monday = 0"""
+    # Epoch day 0 (1970-01-01) is a Thursday, so shift by 3 to get Monday = 0
+    return (days.astype('int64') + 3) % 7
+
+
+def _month(days):
+    """Get the calendar month (1-12) of each datetime64 day"""
+    return days.astype('datetime64[M]').astype('int64') % 12 + 1
 
 
 class LeaveOptimizer:
     def __init__(self, year, country='GB'):
         self.year = year
         self.country = country
-        self.holidays = holidays.country_holidays(country, years=year)
+        self.holidays = _get_holidays(country, year)
+        self._holiday_dates = frozenset(
+            d.date() if isinstance(d, datetime) else d for d in self.holidays
+        )
+        self._holidays_by_month = {}
+        for holiday_date in sorted(self._holiday_dates):
+            self._holidays_by_month.setdefault(holiday_date.month, []).append(holiday_date)
         self.weekends = self.get_weekends()
+        self.num_weekends = len(self.weekends)
         
     def get_weekends(self):
         """Get all weekend dates for the year"""
-        weekends = []
-        start_date = datetime(self.year, 1, 1)
-        end_date = datetime(self.year, 12, 31)
-        
-        current_date = start_date
-        while current_date <= end_date:
-            if current_date.weekday() in [5, 6]:  # Saturday = 5, Sunday = 6
-                weekends.append(current_date.date())
-            current_date += timedelta(days=1)
-        
-        return weekends
+        days = _year_days(self.year)
+        return days[_weekday(days) >= 5].tolist()  # Saturday = 5, Sunday = 6
     
     def get_optimal_leave_days(self, num_leaves, preferred_months=None):
         """Find optimal leave days to maximize total days off"""
-        if preferred_months is None:
-            preferred_months = list(range(1, 13))  # All months
+        # Frozen once so every month check below is a set lookup
+        preferred_months = frozenset(preferred_months) if preferred_months else frozenset(range(1, 13))  # All months
             
         # Get all possible leave strategies
         strategies = []
@@ -42,121 +141,79 @@ class LeaveOptimizer:
         # Combine and rank strategies
         all_opportunities = bridge_opportunities + long_weekend_opportunities
         
-        # Sort by efficiency (days off per leave day)
-        all_opportunities.sort(key=lambda x: x['efficiency'], reverse=True)
+        # Rank by efficiency (days off per leave day), preferring fewer leave days on ties.
+        # A heap only orders the opportunities actually consumed, not the whole list.
+        ranked = [
+            (-opportunity['efficiency'], opportunity['leaves_needed'], index, opportunity)
+            for index, opportunity in enumerate(all_opportunities)
+        ]
+        heapq.heapify(ranked)
         
         # Select best combination within leave budget
         selected_leaves = []
         total_leaves_used = 0
         total_days_off = 0
-        used_date_ranges = []
+        used_dates = set()
         
-        for opportunity in all_opportunities:
+        while ranked and total_leaves_used < num_leaves:
+            opportunity = heapq.heappop(ranked)[-1]
+            
             # Check if this opportunity overlaps with already selected dates
-            if not self.has_date_overlap(opportunity['leave_dates'], used_date_ranges):
+            if used_dates.isdisjoint(opportunity['leave_dates']):
                 if total_leaves_used + opportunity['leaves_needed'] <= num_leaves:
                     selected_leaves.extend(opportunity['leave_dates'])
                     total_leaves_used += opportunity['leaves_needed']
                     total_days_off += opportunity['total_days_off']
                     
-                    # Add this date range to used ranges
-                    used_date_ranges.append(opportunity['leave_dates'])
+                    # Mark these dates as used
+                    used_dates.update(opportunity['leave_dates'])
         
         return selected_leaves, total_days_off, total_leaves_used
     
-    def has_date_overlap(self, new_dates, existing_ranges):
-        """Check if new dates overlap with existing date ranges"""
-        for date in new_dates:
-            for existing_range in existing_ranges:
-                if date in existing_range:
-                    return True
-        return False
-    
     def find_bridge_opportunities(self, preferred_months):
         """Find opportunities to bridge holidays with weekends"""
         opportunities = []
         
-        for holiday_date in self.holidays:
-            if isinstance(holiday_date, datetime):
-                holiday_date = holiday_date.date()
-            
-            # Skip if holiday is not in preferred months
-            if holiday_date.month not in preferred_months:
-                continue
-            
-            # Check if we can bridge before the holiday
-            before_opportunity = self.analyze_bridge_before(holiday_date)
-            if before_opportunity:
-                opportunities.append(before_opportunity)
-            
-            # Check if we can bridge after the holiday
-            after_opportunity = self.analyze_bridge_after(holiday_date)
-            if after_opportunity:
-                opportunities.append(after_opportunity)
+        # Only visit the holidays that fall in preferred months
+        for month in sorted(preferred_months):
+            for holiday_date in self._holidays_by_month.get(month, ()):
+                # Check if we can bridge before the holiday
+                before_opportunity = self.analyze_bridge_before(holiday_date)
+                if before_opportunity:
+                    opportunities.append(before_opportunity)
+                
+                # Check if we can bridge after the holiday
+                after_opportunity = self.analyze_bridge_after(holiday_date)
+                if after_opportunity:
+                    opportunities.append(after_opportunity)
         
         return opportunities
     
     def analyze_bridge_before(self, holiday_date):
         """Analyze bridging opportunity before a holiday"""
-        # Look for weekend before holiday
-        days_before = []
-        current_date = holiday_date - timedelta(days=1)
-        
-        while current_date.weekday() not in [5, 6] and len(days_before) < 4:
-            days_before.append(current_date)
-            current_date -= timedelta(days=1)
-        
-        if current_date.weekday() in [5, 6] and days_before:
-            # Found a weekend before, calculate efficiency
-            weekend_days = []
-            check_date = current_date
-            while check_date.weekday() in [5, 6]:
-                weekend_days.append(check_date)
-                check_date -= timedelta(days=1)
-            
-            total_days_off = len(days_before) + len(weekend_days) + 1  # +1 for holiday
-            leaves_needed = len(days_before)
-            
-            if leaves_needed > 0:
-                return {
-                    'leave_dates': days_before,
-                    'total_days_off': total_days_off,
-                    'leaves_needed': leaves_needed,
-                    'efficiency': total_days_off / leaves_needed,
-                    'description': f"Bridge before {self.holidays[holiday_date]}"
-                }
-        
-        return None
+        return self._bridge_opportunity(holiday_date, -1, "before")
     
     def analyze_bridge_after(self, holiday_date):
         """Analyze bridging opportunity after a holiday"""
-        # Look for weekend after holiday
-        days_after = []
-        current_date = holiday_date + timedelta(days=1)
-        
-        while current_date.weekday() not in [5, 6] and len(days_after) < 4:
-            days_after.append(current_date)
-            current_date += timedelta(days=1)
+        return self._bridge_opportunity(holiday_date, 1, "after")
+    
+    def _bridge_opportunity(self, holiday_date, direction, label):
+        """Build the bridge opportunity between a holiday and the nearest weekend"""
+        holiday_ordinal = holiday_date.toordinal()
+        leaves_needed, weekend_span = _bridge(holiday_ordinal, direction)
         
-        if current_date.weekday() in [5, 6] and days_after:
-            # Found a weekend after, calculate efficiency
-            weekend_days = []
-            check_date = current_date
-            while check_date.weekday() in [5, 6]:
-                weekend_days.append(check_date)
-                check_date += timedelta(days=1)
-            
-            total_days_off = len(days_after) + len(weekend_days) + 1  # +1 for holiday
-            leaves_needed = len(days_after)
-            
-            if leaves_needed > 0:
-                return {
-                    'leave_dates': days_after,
-                    'total_days_off': total_days_off,
-                    'leaves_needed': leaves_needed,
-                    'efficiency': total_days_off / leaves_needed,
-                    'description': f"Bridge after {self.holidays[holiday_date]}"
-                }
+        if leaves_needed > 0:
+            total_days_off = leaves_needed + weekend_span + 1  # +1 for holiday
+            return {
+                'leave_dates': [
+                    date.fromordinal(holiday_ordinal + direction * step)
+                    for step in range(1, leaves_needed + 1)
+                ],
+                'total_days_off': total_days_off,
+                'leaves_needed': leaves_needed,
+                'efficiency': total_days_off / leaves_needed,
+                'description': f"Bridge {label} {self.holidays[holiday_date]}"
+            }
         
         return None
     
@@ -164,73 +221,66 @@ class LeaveOptimizer:
         """Find opportunities to create long weekends"""
         opportunities = []
         
-        # Find Fridays and Mondays that can create 4-day weekends
-        start_date = datetime(self.year, 1, 1)
-        end_date = datetime(self.year, 12, 31)
+        # Find Fridays whose weekend can be stretched to 4 days, both Fridays
+        # and the following Mondays having to fall in the year and preferred months
+        days = _year_days(self.year)
+        months = list(preferred_months)
+        holiday_days = np.array(sorted(self._holiday_dates), dtype='datetime64[D]')
+        monday = days + np.timedelta64(3, 'D')
+        friday_mask = ((_weekday(days) == 4) &
+                       np.isin(_month(days), months) &
+                       (monday <= days[-1]) &
+                       np.isin(_month(monday), months))
         
-        current_date = start_date
-        while current_date <= end_date:
-            # Skip if not in preferred months
-            if current_date.month not in preferred_months:
-                current_date += timedelta(days=1)
-                continue
-                
-            if current_date.weekday() == 4:  # Friday
-                # Check if Monday is not a holiday and in preferred months
-                monday = current_date + timedelta(days=3)
-                if (monday.date() not in self.holidays and 
-                    monday <= end_date and 
-                    monday.month in preferred_months):
-                    opportunities.append({
-                        'leave_dates': [monday.date()],
-                        'total_days_off': 4,
-                        'leaves_needed': 1,
-                        'efficiency': 4.0,
-                        'description': f"Long weekend (Fri-Mon) starting {current_date.strftime('%b %d')}"
-                    })
+        # Either working day around the weekend can be taken off, unless it is a holiday
+        monday_free = ~np.isin(monday, holiday_days)
+        friday_free = ~np.isin(days, holiday_days)
+        
+        for index in np.flatnonzero(friday_mask & (monday_free | friday_free)):
+            friday_date = days[index].item()
+            monday_date = monday[index].item()
             
-            elif current_date.weekday() == 0:  # Monday
-                # Check if Friday is not a holiday and in preferred months
-                friday = current_date - timedelta(days=3)
-                if (friday.date() not in self.holidays and 
-                    friday >= start_date and 
-                    friday.month in preferred_months):
-                    opportunities.append({
-                        'leave_dates': [friday.date()],
-                        'total_days_off': 4,
-                        'leaves_needed': 1,
-                        'efficiency': 4.0,
-                        'description': f"Long weekend (Fri-Mon) ending {current_date.strftime('%b %d')}"
-                    })
+            if monday_free[index]:  # Take the following Monday off
+                opportunities.append({
+                    'leave_dates': [monday_date],
+                    'total_days_off': 4,
+                    'leaves_needed': 1,
+                    'efficiency': 4.0,
+                    'description': f"Long weekend (Fri-Mon) starting {friday_date.strftime('%b %d')}"
+                })
             
-            current_date += timedelta(days=1)
+            if friday_free[index]:  # Take the Friday itself off
+                opportunities.append({
+                    'leave_dates': [friday_date],
+                    'total_days_off': 4,
+                    'leaves_needed': 1,
+                    'efficiency': 4.0,
+                    'description': f"Long weekend (Fri-Mon) ending {monday_date.strftime('%b %d')}"
+                })
         
         return opportunities
 
-def create_calendar_html(year, holidays_dict, optimal_leaves):
+def create_calendar_html(year, holidays_items, leaves_tuple):
     """Create HTML calendar for the year with 3 months per row"""
-    html = f"""
-    <div class="calendar-container">
-        <h2 style="text-align: center; color: #2c3e50;">Annual Leave Calendar for {year}</h2>
-        <div class="legend">
-            <div class="legend-item">
-                <div class="legend-color" style="background-color: #e74c3c;"></div>
-                <span>Public Holidays</span>
-            </div>
-            <div class="legend-item">
-                <div class="legend-color" style="background-color: #3498db;"></div>
-                <span>Optimal Leave Days</span>
-            </div>
-            <div class="legend-item">
-                <div class="legend-color" style="background-color: #2ecc71;"></div>
-                <span>Extended Weekends</span>
-            </div>
-            <div class="legend-item">
-                <div class="legend-color" style="background-color: #ecf0f1;"></div>
-                <span>Weekends</span>
-            </div>
-        </div>
-    """
+    # Inputs arrive as tuples so the rendered calendar can be cached by the caller
+    holidays_dict = dict(holidays_items)
+    optimal_leaves = set(leaves_tuple)
+    
+    # Classify every day of the year in one vectorized pass
+    days = _year_days(year)
+    weekday = _weekday(days)
+    holiday_mask = np.isin(days, np.array(list(holidays_dict), dtype='datetime64[D]'))
+    leave_mask = np.isin(days, np.array(list(optimal_leaves), dtype='datetime64[D]')) & ~holiday_mask
+    class_ids = (weekday >= 5) + 2 * holiday_mask + 4 * leave_mask
+    day_classes = _DAY_CLASSES[class_ids]
+    
+    titles = np.where(leave_mask, "Optimal Leave Day", "").astype(object)
+    for holiday_date, holiday_name in holidays_dict.items():
+        if holiday_date.year == year:
+            titles[holiday_date.timetuple().tm_yday - 1] = holiday_name
+    
+    # Index of the first day of each month, plus the end of the year
+    month_starts = np.searchsorted(_month(days), range(1, 14))
     
     # Create calendar in quarters (2 months per row)
     quarters = [
@@ -242,50 +292,24 @@ def create_calendar_html(year, holidays_dict, optimal_leaves):
         [11, 12]   # Q6: Nov, Dec
     ] 
     
+    months_by_quarter = []
     for quarter in quarters:
-        html += '<div style="display: flex; gap: 20px; margin-bottom: 30px; flex-wrap: wrap;">'
-        
+        months = []
         for month in quarter:
-            month_name = calendar.month_name[month]
-            html += f'''
-            <div style="flex: 1; min-width: 300px;">
-                <div class="month-header">{month_name} {year}</div>
-                <div class="calendar-grid">
-            '''
-            
-            # Day headers
-            for day in ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']:
-                html += f'<div class="day-header">{day}</div>'
-            
-            # Get calendar for month
-            cal = calendar.monthcalendar(year, month)
-            
-            for week in cal:
-                for day in week:
-                    if day == 0:
-                        html += '<div class="day-cell"></div>'
-                    else:
-                        date_obj = datetime(year, month, day).date()
-                        day_class = "day-cell"
-                        
-                        # Check day type
-                        if date_obj.weekday() in [5, 6]:  # Weekend
-                            day_class += " weekend"
-                        
-                        if date_obj in holidays_dict:  # Holiday
-                            day_class += " holiday"
-                            title = holidays_dict[date_obj]
-                        elif date_obj in optimal_leaves:  # Optimal leave day
-                            day_class += " optimal-leave"
-                            title = "Optimal Leave Day"
-                        else:
-                            title = ""
-                        
-                        html += f'<div class="{day_class}" title="{title}">{day}</div>'
-            
-            html += '</div></div>'  # Close calendar-grid and month container
-        
-        html += '</div>'  # Close quarter row
+            # Pad the grid so the first day lands under its weekday
+            start, end = month_starts[month - 1], month_starts[month]
+            leading = int(weekday[start])
+            months.append({
+                'name': calendar.month_name[month],
+                'leading': leading,
+                'cells': zip(range(1, end - start + 1), day_classes[start:end], titles[start:end]),
+                'trailing': -(leading + end - start) % 7,
+            })
+        months_by_quarter.append(months)
     
-    html += '</div>'  # Close calendar-container
-    return html
\ No newline at end of file
+    return _CALENDAR_TEMPLATE.render(
+        year=year,
+        quarters=months_by_quarter,
+        day_header_row=_DAY_HEADER_ROW,
+        empty_cell=_EMPTY_DAY_CELL,
+    )